@@ -1,4 +1,5 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from .database import engine, Base
 from .routers import receipts, reports, auth, exports, users, budgets, tours
 import time
@@ -44,7 +45,10 @@ app = FastAPI(
     """,
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson serializes in C (2-5x faster than json.dumps) — JSON encoding is
+    # the dominant post-DB CPU cost on the list/dashboard endpoints
+    default_response_class=ORJSONResponse
 )
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -57,6 +61,10 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Non-safelisted response headers are invisible to cross-origin JS unless
+    # exposed: the SPA needs X-Next-Cursor for pagination and ETag for
+    # conditional requests.
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 @app.middleware("http")
@@ -136,6 +136,8 @@ class Report(Base):
     
     __table_args__ = (
         Index('idx_report_company_date', 'company_id', 'created_at'),
+        Index('idx_report_tour', 'tour_id'),
+        Index('idx_report_company_period', 'company_id', 'year', 'month'),
     )
 
 class TourBudget(Base):
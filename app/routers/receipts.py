@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFile, File
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from ..database import get_db
+from ..database import get_db, get_async_db
 from .. import models, schemas
 from ..services import ocr
 
+import aiofiles
+import asyncio
+
 router = APIRouter()
 
 from ..auth import get_user_company
@@ -61,6 +65,60 @@ def upload_receipt(
     
     return db_receipt
 
+@router.post("/upload-batch", response_model=List[schemas.Receipt])
+async def upload_receipts_batch(
+    files: List[UploadFile] = File(...),
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    db: AsyncSession = Depends(get_async_db),
+    company_id: str = Depends(get_user_company)
+):
+    """
+    Upload several receipts at once. OCR for the whole batch runs
+    concurrently (asyncio.gather), so N receipts cost ~1 Gemini round trip.
+    """
+    from ..services.storage import storage_service
+
+    UPLOAD_DIR = "uploads/receipts"
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+    db_receipts = []
+    for file in files:
+        content = await file.read()
+
+        # Upload to Cloud (Supabase). The client is synchronous HTTP, so run
+        # it in the threadpool: a batch of uploads must not stall the loop.
+        storage_data = await asyncio.to_thread(
+            storage_service.upload_bytes, content, file.filename, file.content_type, company_id
+        )
+        cloud_path = storage_data.get("storage_path")
+
+        # Save File Locally (Fallback/Cache)
+        file_extension = Path(file.filename).suffix
+        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        local_path = os.path.join(UPLOAD_DIR, unique_filename)
+        async with aiofiles.open(local_path, "wb") as buffer:
+            await buffer.write(content)
+
+        db_receipt = models.Receipt(
+            company_id=company_id,
+            file_url=local_path,
+            storage_path=cloud_path,
+            filename=file.filename,
+            content_type=file.content_type,
+            status=models.ReceiptStatus.PENDING.value
+        )
+        db.add(db_receipt)
+        db_receipts.append(db_receipt)
+
+    await db.commit()
+    for db_receipt in db_receipts:
+        await db.refresh(db_receipt)
+
+    # Trigger OCR for the whole batch (Background, own DB sessions)
+    background_tasks.add_task(ocr.process_receipts_batch, [r.id for r in db_receipts])
+
+    return db_receipts
+
 @router.get("/", response_model=List[schemas.Receipt])
 def read_receipts(
     skip: int = 0, 
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date
 from pathlib import Path
-import shutil
+import aiofiles
+import base64
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, UploadFile, File
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+import hashlib
+from ..database import get_async_db
 from .. import models, schemas
 from ..services import report_generator
 from ..auth import get_current_user, get_user_company
@@ -26,17 +29,18 @@ async def upload_file(
     # Create uploads directory if it doesn't exist
     upload_dir = Path("uploads")
     upload_dir.mkdir(parents=True, exist_ok=True)
-    
+
     # Generate unique filename
     file_extension = Path(file.filename).suffix
     unique_filename = f"{uuid.uuid4()}{file_extension}"
     file_path = upload_dir / unique_filename
-    
-    # Save file
+
+    # Save file (chunked async copy: a large upload never blocks the event loop)
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(1 << 20):  # 1 MB chunks
+                await buffer.write(chunk)
+
         # Return initial status
         return {
             "id": unique_filename, # Use filename as temporary ID
@@ -48,35 +52,39 @@ async def upload_file(
         raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
 
 @router.post("/generate", response_model=schemas.Report)
-def generate_report(
+async def generate_report(
     report: schemas.ReportCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     user_id = current_user["id"]
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not db_user or not db_user.company_id:
+    # Only the company_id is needed here: a scalar select avoids hydrating
+    # the full User row on every report creation.
+    company_id = (await db.execute(
+        select(models.User.company_id).where(models.User.id == user_id)
+    )).scalar_one_or_none()
+    if not company_id:
         raise HTTPException(status_code=403, detail="User not linked to a company. Please join an organization.")
-    
-    company_id = db_user.company_id
-    
+
     summary = "Reporte pendiente de procesamiento"
     vendor = None
     amount = None
     currency = None
     category = report.category # Default to manual selection if present
-    existing_duplicate = None
-    
+    existing_duplicate_id = None
+
     # [Start] Read-Only Check for Closed Tours
     if report.tour_id:
-        closed_tour = db.query(models.TourClosure).filter(
-            models.TourClosure.tour_id == report.tour_id,
-            models.TourClosure.company_id == company_id
-        ).first()
+        closed_tour = (await db.execute(
+            select(models.TourClosure.tour_id).where(
+                models.TourClosure.tour_id == report.tour_id,
+                models.TourClosure.company_id == company_id
+            )
+        )).scalars().first()
         if closed_tour:
             raise HTTPException(
-                status_code=400, 
+                status_code=400,
                 detail=f"El Tour {report.tour_id} está CERRADO y no admite nuevos reportes."
             )
     # [End] Read-Only Check
@@ -89,19 +97,21 @@ def generate_report(
         # If no manual category, use AI suggested one
         if not category:
             category = data.get('category')
-            
+
         summary = (
             f"Factura de {vendor} del {data.get('date', 'N/A')}. "
             f"Total: {currency} {amount}. "
             f"Categoría: {category}"
         )
-        
-        # Check for duplicates
-        existing_duplicate = db.query(models.Report).filter(
-            models.Report.company_id == company_id,
-            models.Report.vendor == vendor,
-            models.Report.amount == amount
-        ).first()
+
+        # Check for duplicates (only the id is needed)
+        existing_duplicate_id = (await db.execute(
+            select(models.Report.id).where(
+                models.Report.company_id == company_id,
+                models.Report.vendor == vendor,
+                models.Report.amount == amount
+            )
+        )).scalars().first()
 
     db_report = models.Report(
         company_id=company_id,
@@ -117,88 +127,185 @@ def generate_report(
         source_file_path=report.source_file_path,
         status=models.ReportStatus.PENDING_REVIEW.value,
         summary_text=summary,
-        is_duplicate=True if existing_duplicate else False,
-        potential_duplicate_of=existing_duplicate.id if existing_duplicate else None
+        is_duplicate=True if existing_duplicate_id else False,
+        potential_duplicate_of=existing_duplicate_id
     )
 
     db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
-    
+    await db.commit()
+    await db.refresh(db_report)
+
     # Always trigger report generation background task
-    background_tasks.add_task(report_generator.create_report, db_report.id, db)
-    
+    # The task opens its own session: the request session closes before it runs.
+    background_tasks.add_task(report_generator.create_report, db_report.id)
+
     return db_report
 
-@router.get("/", response_model=List[schemas.Report])
-def list_reports(
+def _encode_cursor(created_at: datetime, report_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{report_id}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, report_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), report_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _parse_year_month(value: str, param: str) -> tuple:
+    try:
+        year, month = map(int, value.split("-"))
+        if not 1 <= month <= 12:
+            raise ValueError
+        return year, month
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {param}: expected YYYY-MM")
+
+@router.get("/")
+async def list_reports(
     month: Optional[int] = Query(None),
     year: Optional[int] = Query(None),
     tour_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    from_date: Optional[str] = Query(None, description="YYYY-MM, inclusive lower bound"),
+    to_date: Optional[str] = Query(None, description="YYYY-MM, inclusive upper bound"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
     company_id: str = Depends(get_user_company)
 ):
-    query = db.query(models.Report).filter(models.Report.company_id == company_id)
-    if month: query = query.filter(models.Report.month == month)
-    if year: query = query.filter(models.Report.year == year)
-    if tour_id: query = query.filter(models.Report.tour_id == tour_id)
-    return query.order_by(models.Report.created_at.desc()).all()
+    """
+    List reports (JSON array of schemas.Report), newest first, paginated by
+    keyset on (created_at, id): pass back the X-Next-Cursor header to get the
+    next page. Unlike OFFSET, page cost stays O(log N + page) however deep
+    the client scrolls. Serialization is streamed row by row.
+    """
+    query = select(models.Report).where(models.Report.company_id == company_id)
+    if month: query = query.where(models.Report.month == month)
+    if year: query = query.where(models.Report.year == year)
+    if tour_id: query = query.where(models.Report.tour_id == tour_id)
+    # YYYY-MM range filters. Written as OR/AND (not a Python conditional on
+    # column objects) so the predicate is correct across year boundaries and
+    # can use the (company_id, year, month) index.
+    if from_date:
+        f_year, f_month = _parse_year_month(from_date, "from_date")
+        query = query.where(or_(
+            models.Report.year > f_year,
+            and_(models.Report.year == f_year, models.Report.month >= f_month)
+        ))
+    if to_date:
+        t_year, t_month = _parse_year_month(to_date, "to_date")
+        query = query.where(or_(
+            models.Report.year < t_year,
+            and_(models.Report.year == t_year, models.Report.month <= t_month)
+        ))
+    if cursor:
+        cursor_ts, cursor_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(models.Report.created_at, models.Report.id) < (cursor_ts, cursor_id)
+        )
+
+    reports = (await db.execute(
+        query.order_by(models.Report.created_at.desc(), models.Report.id.desc()).limit(limit)
+    )).scalars().all()
+
+    headers = {}
+    if len(reports) == limit:
+        last = reports[-1]
+        headers["X-Next-Cursor"] = _encode_cursor(last.created_at, last.id)
+
+    async def generate():
+        yield "["
+        first = True
+        for report in reports:
+            if not first:
+                yield ","
+            first = False
+            yield schemas.Report.model_validate(report).model_dump_json()
+        yield "]"
+
+    return StreamingResponse(generate(), media_type="application/json", headers=headers)
 
 @router.patch("/{report_id}/approve", response_model=schemas.Report)
-def approve_report(
+async def approve_report(
     report_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     company_id: str = Depends(get_user_company)
 ):
-    report = db.query(models.Report).filter(models.Report.id == report_id, models.Report.company_id == company_id).first()
+    report = (await db.execute(
+        select(models.Report).where(models.Report.id == report_id, models.Report.company_id == company_id)
+    )).scalars().first()
     if not report: raise HTTPException(status_code=404, detail="Report not found")
     report.status = models.ReportStatus.APPROVED.value
-    db.commit()
-    db.refresh(report)
+    await db.commit()
+    await db.refresh(report)
     return report
 
 @router.patch("/{report_id}/reject", response_model=schemas.Report)
-def reject_report(
+async def reject_report(
     report_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     company_id: str = Depends(get_user_company)
 ):
-    report = db.query(models.Report).filter(models.Report.id == report_id, models.Report.company_id == company_id).first()
+    report = (await db.execute(
+        select(models.Report).where(models.Report.id == report_id, models.Report.company_id == company_id)
+    )).scalars().first()
     if not report: raise HTTPException(status_code=404, detail="Report not found")
     report.status = models.ReportStatus.REJECTED.value
-    db.commit()
-    db.refresh(report)
+    await db.commit()
+    await db.refresh(report)
     return report
 
+@router.delete("/{report_id}", response_model=dict)
+async def delete_report(
+    report_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    company_id: str = Depends(get_user_company)
+):
+    # Core-level DELETE: one round-trip, no ORM hydration. rowcount tells us
+    # whether the report existed (scoped to the caller's company).
+    result = await db.execute(
+        delete(models.Report).where(
+            models.Report.id == report_id,
+            models.Report.company_id == company_id
+        )
+    )
+    await db.commit()
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return {"status": "deleted", "id": report_id}
+
 @router.get("/budget", response_model=dict)
-def get_budget(
+async def get_budget(
     tour_id: str = Query(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     company_id: str = Depends(get_user_company)
 ):
-    budget = db.query(models.TourBudget).filter(
-        models.TourBudget.tour_id == tour_id,
-        models.TourBudget.company_id == company_id,
-        models.TourBudget.category == "TOTAL"
-    ).first()
-    
+    budget = (await db.execute(
+        select(models.TourBudget).where(
+            models.TourBudget.tour_id == tour_id,
+            models.TourBudget.company_id == company_id,
+            models.TourBudget.category == "TOTAL"
+        )
+    )).scalars().first()
+
     return {"amount": budget.budget_amount if budget else 0}
 
 @router.post("/budget", response_model=dict)
-def set_budget(
+async def set_budget(
     budget_data: schemas.TourBudgetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     company_id: str = Depends(get_user_company)
 ):
     # Ensure category is TOTAL for this specific feature
     category = "TOTAL"
-    
-    existing = db.query(models.TourBudget).filter(
-        models.TourBudget.tour_id == budget_data.tour_id,
-        models.TourBudget.company_id == company_id,
-        models.TourBudget.category == category
-    ).first()
-    
+
+    existing = (await db.execute(
+        select(models.TourBudget).where(
+            models.TourBudget.tour_id == budget_data.tour_id,
+            models.TourBudget.company_id == company_id,
+            models.TourBudget.category == category
+        )
+    )).scalars().first()
+
     if existing:
         existing.budget_amount = budget_data.budget_amount
         existing.updated_at = datetime.utcnow()
@@ -210,14 +317,14 @@ def set_budget(
             budget_amount=budget_data.budget_amount
         )
         db.add(new_budget)
-    
-    db.commit()
+
+    await db.commit()
     return {"status": "success", "tour_id": budget_data.tour_id, "amount": budget_data.budget_amount}
 
 @router.get("/summary", response_model=dict)
-def get_tour_summary(
+async def get_tour_summary(
     tour_id: str = Query(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     company_id: str = Depends(get_user_company)
 ):
     """
@@ -225,28 +332,32 @@ def get_tour_summary(
     Balance = (Budget + Total Collections) - Total Expenses
     """
     # 1. Get Budget
-    budget_rec = db.query(models.TourBudget).filter(
-        models.TourBudget.tour_id == tour_id,
-        models.TourBudget.company_id == company_id,
-        models.TourBudget.category == "TOTAL"
-    ).first()
+    budget_rec = (await db.execute(
+        select(models.TourBudget).where(
+            models.TourBudget.tour_id == tour_id,
+            models.TourBudget.company_id == company_id,
+            models.TourBudget.category == "TOTAL"
+        )
+    )).scalars().first()
     budget = budget_rec.budget_amount if budget_rec else 0
 
-    # 2. Get Reports
-    reports = db.query(models.Report).filter(
-        models.Report.company_id == company_id,
-        models.Report.tour_id == tour_id
-    ).all()
+    # 2. Get Reports (only the two columns the math needs)
+    reports = (await db.execute(
+        select(models.Report.category, models.Report.amount).where(
+            models.Report.company_id == company_id,
+            models.Report.tour_id == tour_id
+        )
+    )).all()
 
     total_advances = 0 # Legacy, kept for compatibility if needed elsewhere
     total_collections = 0
     total_expenses = 0
 
-    for r in reports:
-        amount = r.amount or 0
-        if r.category == "ANTICIPO_RECIBIDO":
+    for category, amount in reports:
+        amount = amount or 0
+        if category == "ANTICIPO_RECIBIDO":
             total_advances += amount
-        elif r.category == "RECAUDO_CLIENTE":
+        elif category == "RECAUDO_CLIENTE":
             total_collections += amount
         else:
             total_expenses += amount
@@ -265,141 +376,228 @@ def get_tour_summary(
         "currency": "COP"
     }
 
+async def _reports_etag(db: AsyncSession, company_id: str, *extra) -> str:
+    """
+    Cheap version stamp for a company's reports: COUNT + MAX(created_at) via
+    one index-only query, hashed together with the query params so different
+    filters never share a cache entry.
+    """
+    count, max_created = (await db.execute(
+        select(func.count(), func.max(models.Report.created_at)).where(
+            models.Report.company_id == company_id
+        )
+    )).one()
+    token = "|".join([company_id, str(count), str(max_created), *map(str, extra)])
+    return hashlib.blake2b(token.encode(), digest_size=8).hexdigest()
+
+async def _budgets_stamp(db: AsyncSession, company_id: str) -> str:
+    """Version stamp for a company's tour budgets (COUNT + MAX(updated_at)),
+    for responses that also depend on budget_amount: a budget change must
+    invalidate their ETags even when no report row moved."""
+    count, max_updated = (await db.execute(
+        select(func.count(), func.max(models.TourBudget.updated_at)).where(
+            models.TourBudget.company_id == company_id
+        )
+    )).one()
+    return f"{count}|{max_updated}"
+
 @router.get("/admin/summary")
-def get_admin_summary(
+async def get_admin_summary(
+    request: Request,
+    response: Response,
     month: Optional[int] = Query(None),
     year: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     company_id: str = Depends(get_user_company)
 ):
     """
     Returns a list of all tours with their financial status for the accountant.
     """
-    # 1. Get all unique tours for this company
-    query = db.query(models.Report.tour_id).filter(models.Report.company_id == company_id)
-    if month: query = query.filter(models.Report.month == month)
-    if year: query = query.filter(models.Report.year == year)
-    
-    tours = [r[0] for r in query.distinct().all() if r[0]]
-    
-    summary_list = []
-    
-    for t_id in tours:
-        # Get Budget (cat TOTAL)
-        budget_rec = db.query(models.TourBudget).filter(
-            models.TourBudget.tour_id == t_id,
+    # total_advances/balance come from TourBudget, so the ETag must also
+    # rotate when a budget changes, not just when a report row does.
+    etag = await _reports_etag(db, company_id, month, year, await _budgets_stamp(db, company_id))
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, max-age=30"
+
+    # 1. One grouped query replaces the per-tour budget + reports round-trips:
+    # the DB aggregates per (tour, category) and ships <= T*C rows.
+    grouped = select(
+        models.Report.tour_id,
+        models.Report.category,
+        func.max(models.Report.client_name),
+        func.coalesce(func.sum(models.Report.amount), 0)
+    ).where(
+        models.Report.company_id == company_id,
+        models.Report.tour_id.isnot(None),
+        models.Report.tour_id != ""
+    )
+    # month/year only restrict WHICH tours appear (tours with activity in the
+    # period); each listed tour is still aggregated over its entire history,
+    # so the balance always nets the full budget against full expenses.
+    if month or year:
+        tours_in_period = select(models.Report.tour_id).where(
+            models.Report.company_id == company_id
+        ).distinct()
+        if month: tours_in_period = tours_in_period.where(models.Report.month == month)
+        if year: tours_in_period = tours_in_period.where(models.Report.year == year)
+        grouped = grouped.where(models.Report.tour_id.in_(tours_in_period))
+    rows = (await db.execute(
+        grouped.group_by(models.Report.tour_id, models.Report.category)
+    )).all()
+
+    # 2. All TOTAL budgets for the company in one query
+    budgets = dict((await db.execute(
+        select(models.TourBudget.tour_id, models.TourBudget.budget_amount).where(
             models.TourBudget.company_id == company_id,
             models.TourBudget.category == "TOTAL"
-        ).first()
-        budget = budget_rec.budget_amount if budget_rec else 0
+        )
+    )).all())
 
-        # Get stats
-        reports = db.query(models.Report).filter(
-            models.Report.tour_id == t_id,
-            models.Report.company_id == company_id
-        ).all()
-        
-        advances = 0
-        collections = 0
-        expenses = 0
-        categories = {}
-        client_name = "N/A"
-        
-        for r in reports:
-            if r.client_name: client_name = r.client_name
-            amount = r.amount or 0
-            if r.category == "ANTICIPO_RECIBIDO":
-                advances += amount
-            elif r.category == "RECAUDO_CLIENTE":
-                collections += amount
-            else:
-                expenses += amount
-                cat = r.category or "📦 Otros"
-                categories[cat] = categories.get(cat, 0) + amount
-        
+    # 3. Single pass over the grouped rows
+    tour_map = {}
+    for t_id, category, client_name, amount in rows:
+        stats = tour_map.setdefault(t_id, {
+            "client_name": "N/A",
+            "collections": 0,
+            "expenses": 0,
+            "categories": {}
+        })
+        if client_name:
+            stats["client_name"] = client_name
+        if category == "ANTICIPO_RECIBIDO":
+            pass # Advances shown from budget below, as before
+        elif category == "RECAUDO_CLIENTE":
+            stats["collections"] += amount
+        else:
+            stats["expenses"] += amount
+            cat = category or "📦 Otros"
+            stats["categories"][cat] = stats["categories"].get(cat, 0) + amount
+
+    summary_list = []
+    for t_id, stats in tour_map.items():
+        budget = budgets.get(t_id, 0)
         summary_list.append({
             "tour_id": t_id,
-            "client_name": client_name,
+            "client_name": stats["client_name"],
             "total_advances": int(budget), # We use budget as the main "advance/fund"
-            "total_collections": int(collections),
-            "total_expenses": int(expenses),
-            "balance": int((budget + collections) - expenses),
-            "categories": categories
+            "total_collections": int(stats["collections"]),
+            "total_expenses": int(stats["expenses"]),
+            "balance": int((budget + stats["collections"]) - stats["expenses"]),
+            "categories": stats["categories"]
         })
-        
+
     return summary_list
 
 
+INCOME_CATEGORIES = ("ANTICIPO_RECIBIDO", "RECAUDO_CLIENTE")
+
+# Chart labels, indexed by month number (strptime is slow and holds a lock)
+MONTH_ABBR = ('', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
 @router.get("/dashboard-stats", response_model=dict)
-def get_dashboard_stats(
+async def get_dashboard_stats(
+    request: Request,
+    response: Response,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     company_id: str = Depends(get_user_company)
 ):
-    # Base query
-    query = db.query(models.Report).filter(models.Report.company_id == company_id)
-    
+    # SPA polls this endpoint: when nothing changed, answer 304 off a single
+    # index-only version query instead of recomputing the aggregates.
+    etag = await _reports_etag(db, company_id, start_date, end_date)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, max-age=30"
+
+    # Shared WHERE clause for all the aggregate queries
+    filters = [models.Report.company_id == company_id]
     if start_date:
-        query = query.filter(models.Report.created_at >= start_date)
+        filters.append(models.Report.created_at >= start_date)
     if end_date:
-        query = query.filter(models.Report.created_at <= datetime.combine(end_date, datetime.max.time()))
-        
-    reports = query.all()
-    
+        filters.append(models.Report.created_at <= datetime.combine(end_date, datetime.max.time()))
+
+    # Advances/Recaudos are income, everything else (incl. NULL category) is spend
+    is_expense = or_(
+        models.Report.category.is_(None),
+        models.Report.category.notin_(INCOME_CATEGORIES)
+    )
+
+    # 1. Totals + category distribution in one GROUP BY (<= #categories rows)
+    category_rows = (await db.execute(
+        select(
+            models.Report.category,
+            func.count(models.Report.id),
+            func.coalesce(func.sum(models.Report.amount), 0)
+        ).where(*filters).group_by(models.Report.category)
+    )).all()
+
     total_spent = 0
     total_advances = 0
     total_collections = 0
-    total_reports = len(reports)
-    
-    monthly_data = {}
-    category_data = {}
-    client_data = {}
-    
-    for r in reports:
-        amount = r.amount or 0
-        
-        # Handle Advances vs Recaudos vs Expenses
-        if r.category == "ANTICIPO_RECIBIDO":
+    total_reports = 0
+    category_stats = []
+
+    for cat, count, amount in category_rows:
+        total_reports += count
+        if cat == "ANTICIPO_RECIBIDO":
             total_advances += amount
-            continue # Don't count as spent
-        
-        if r.category == "RECAUDO_CLIENTE":
+        elif cat == "RECAUDO_CLIENTE":
             total_collections += amount
-            continue # Don't count as spent
-            
-        total_spent += amount
-        
-        # Monthly Stats
-        month_key = r.created_at.strftime("%b") # Jan, Feb
-        monthly_data[month_key] = monthly_data.get(month_key, 0) + amount
-        
-        # Category Stats
-        cat = r.category or "Uncategorized"
-        category_data[cat] = category_data.get(cat, 0) + amount
-        
-        # Client Stats (Top Clients by Spend)
-        client = r.client_name or "Unknown"
-        client_data[client] = client_data.get(client, 0) + amount
-
-    # Format for Charts
-    monthly_stats = [{"month": k, "total": int(v)} for k, v in monthly_data.items()]
-    category_stats = [{"name": k, "value": int(v)} for k, v in category_data.items()]
-    client_stats = [{"name": k, "value": int(v)} for k, v in client_data.items()]
-    
-    # Sort
-    client_stats.sort(key=lambda x: x['value'], reverse=True)
-    client_stats = client_stats[:5] # Top 5
-    
-    recent_activity = []
-    for r in reports[:5]: # Just take first 5 from query result (ideally sort by date desc first)
-         recent_activity.append({
-             "id": r.id,
-             "tour_id": r.tour_id,
-             "created_at": r.created_at.isoformat(),
-             "amount": int(r.amount) if r.amount else 0,
-             "category": r.category
-         })
+        else:
+            total_spent += amount
+            category_stats.append({"name": cat or "Uncategorized", "value": int(amount)})
+
+    # 2. Monthly spend, aggregated DB-side (<= 6 rows transferred)
+    if "sqlite" in str(db.get_bind().url):
+        ym = func.strftime('%Y-%m', models.Report.created_at).label('ym')
+    else:
+        ym = func.to_char(models.Report.created_at, 'YYYY-MM').label('ym')
+
+    monthly_rows = (await db.execute(
+        select(ym, func.coalesce(func.sum(models.Report.amount), 0))
+        .where(*filters, is_expense)
+        .group_by(ym).order_by(ym.desc()).limit(6)
+    )).all()
+
+    monthly_stats = [
+        {"month": MONTH_ABBR[int(k.split("-")[1])], "total": int(v)}
+        for k, v in reversed(monthly_rows)
+    ]
+
+    # 3. Top 5 clients by spend
+    client_rows = (await db.execute(
+        select(
+            models.Report.client_name,
+            func.coalesce(func.sum(models.Report.amount), 0).label('total')
+        ).where(*filters, is_expense)
+        .group_by(models.Report.client_name)
+        .order_by(func.sum(models.Report.amount).desc()).limit(5)
+    )).all()
+    client_stats = [{"name": k or "Unknown", "value": int(v)} for k, v in client_rows]
+
+    # 4. Recent activity: latest 5 rows only
+    recent_rows = (await db.execute(
+        select(
+            models.Report.id, models.Report.tour_id, models.Report.created_at,
+            models.Report.amount, models.Report.category
+        ).where(*filters).order_by(models.Report.created_at.desc()).limit(5)
+    )).all()
+
+    recent_activity = [
+        {
+            "id": r.id,
+            "tour_id": r.tour_id,
+            "created_at": r.created_at.isoformat(),
+            "amount": int(r.amount) if r.amount else 0,
+            "category": r.category
+        }
+        for r in recent_rows
+    ]
 
     return {
         "total_reports": total_reports,
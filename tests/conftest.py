@@ -1,6 +1,7 @@
 import pytest
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from jose import jwt
@@ -14,7 +15,7 @@ os.environ["GEMINI_API_KEY"] = "fake-key"
 os.environ["SUPABASE_URL"] = "https://fake.supabase.co"
 os.environ["SUPABASE_KEY"] = "fake-key"
 
-from app.database import Base, get_db
+from app.database import Base, get_db, get_async_db
 from app.main import app
 from app.auth import get_current_user
 from app.models import User, Company, Receipt, Report # Explicit import to register models
@@ -23,6 +24,10 @@ from app.models import User, Company, Receipt, Report # Explicit import to regis
 engine = create_engine("sqlite:///./test.db", connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine over the same test.db file for the async endpoints
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 @pytest.fixture(scope="function")
 def test_db():
     Base.metadata.create_all(bind=engine)
@@ -41,9 +46,15 @@ def client(test_db):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     del app.dependency_overrides[get_db]
+    del app.dependency_overrides[get_async_db]
 
 @pytest.fixture
 def user_payload():
@@ -1,5 +1,5 @@
 from unittest.mock import patch, MagicMock
-from app.services.ocr import process_receipt_with_gemini
+from app.services.ocr import process_receipt_with_gemini, MODELS_TO_TRY
 import json
 
 @patch('app.services.ocr.genai.GenerativeModel')
@@ -32,10 +32,67 @@ def test_ocr_extraction_success(mock_img_open, mock_model_cls):
     assert result["amount"] == 150000.00
     assert result["confidence_score"] == 0.95
 
+def _mock_gemini_response():
+    response = MagicMock()
+    response.text = '{"vendor": "Tienda Retry", "amount": 5000.0}'
+    return response
+
+@patch('tenacity.nap.time.sleep', MagicMock())  # no real backoff waits in tests
+@patch('app.services.ocr.genai.GenerativeModel')
+@patch('app.services.ocr.Image.open')
+def test_ocr_extraction_retries_on_429(mock_img_open, mock_model_cls):
+    mock_img_open.return_value = MagicMock()
+    mock_model = mock_model_cls.return_value
+    # First call rate-limited, second succeeds: same model should be retried
+    mock_model.generate_content.side_effect = [
+        Exception("429 Resource has been exhausted"),
+        _mock_gemini_response()
+    ]
+
+    with patch.dict('app.services.ocr._MODEL_CACHE', clear=True):
+        result = process_receipt_with_gemini(b"retryable_image_bytes", retries=1)
+
+    assert result["vendor"] == "Tienda Retry"
+    assert mock_model.generate_content.call_count == 2
+    # Only the first model was ever constructed: the 429 was retried in place
+    assert mock_model_cls.call_count == 1
+    assert mock_model_cls.call_args_list[0].args[0] == MODELS_TO_TRY[0]
+
+@patch('tenacity.nap.time.sleep', MagicMock())
+@patch('app.services.ocr.genai.GenerativeModel')
+@patch('app.services.ocr.Image.open')
+def test_ocr_extraction_non_retryable_falls_to_next_model(mock_img_open, mock_model_cls):
+    mock_img_open.return_value = MagicMock()
+    mock_model = mock_model_cls.return_value
+    # A 400 is not retryable: no second attempt on the same model, the
+    # fallback chain should move straight to the next model name
+    mock_model.generate_content.side_effect = [
+        Exception("400 Invalid argument"),
+        _mock_gemini_response()
+    ]
+
+    with patch.dict('app.services.ocr._MODEL_CACHE', clear=True):
+        result = process_receipt_with_gemini(b"non_retryable_image_bytes", retries=1)
+
+    assert result["vendor"] == "Tienda Retry"
+    assert mock_model.generate_content.call_count == 2
+    # Two different models were constructed: no retry happened on the first
+    assert mock_model_cls.call_count == 2
+    assert [c.args[0] for c in mock_model_cls.call_args_list] == MODELS_TO_TRY[:2]
+
 @patch('app.services.ocr.genai.GenerativeModel')
-def test_ocr_extraction_retry_logic(mock_model_cls):
-    # Setup failure then success? 
-    # Current implementation retries on specific 429/503 errors only or generic exceptions?
-    # Logic: "if '429' in error_str... continue"
-    # To test this we need side_effect on generate_content
-    pass
+@patch('app.services.ocr.Image.open')
+def test_ocr_content_hash_cache(mock_img_open, mock_model_cls):
+    # Same bytes twice: the second call must come from the content-hash cache
+    # without touching Gemini again
+    mock_img_open.return_value = MagicMock()
+    mock_model = mock_model_cls.return_value
+    mock_model.generate_content.return_value = _mock_gemini_response()
+
+    with patch.dict('app.services.ocr._MODEL_CACHE', clear=True), \
+         patch.dict('app.services.ocr._OCR_CACHE', clear=True):
+        first = process_receipt_with_gemini(b"cacheable_image_bytes")
+        second = process_receipt_with_gemini(b"cacheable_image_bytes")
+
+    assert first == second
+    assert mock_model.generate_content.call_count == 1
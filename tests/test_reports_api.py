@@ -0,0 +1,118 @@
+from datetime import datetime
+from app import models
+
+def _company_for(test_db, client, auth_headers):
+    # First authenticated call creates the user's company
+    client.get("/reports/", headers=auth_headers)
+    return test_db.query(models.Company).filter(
+        models.Company.owner.has(email="test@example.com")
+    ).first()
+
+def _add_report(test_db, company_id, **kwargs):
+    report = models.Report(company_id=company_id, **kwargs)
+    test_db.add(report)
+    test_db.commit()
+    return report
+
+def test_list_reports_date_range_across_year_boundary(client, auth_headers, test_db):
+    """
+    from_date/to_date are YYYY-MM bounds that must work across a year change,
+    not just within one year.
+    """
+    company = _company_for(test_db, client, auth_headers)
+    _add_report(test_db, company.id, year=2025, month=1, client_name="too early")
+    _add_report(test_db, company.id, year=2025, month=12, client_name="in range")
+    _add_report(test_db, company.id, year=2026, month=1, client_name="in range")
+    _add_report(test_db, company.id, year=2026, month=3, client_name="too late")
+
+    response = client.get("/reports/?from_date=2025-12&to_date=2026-01", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+    assert all(r["client_name"] == "in range" for r in data)
+
+def test_list_reports_rejects_malformed_date_params(client, auth_headers, test_db):
+    _company_for(test_db, client, auth_headers)
+    assert client.get("/reports/?from_date=garbage", headers=auth_headers).status_code == 400
+    assert client.get("/reports/?to_date=2026-13", headers=auth_headers).status_code == 400
+
+def test_list_reports_cursor_pagination(client, auth_headers, test_db):
+    """
+    Walking pages via X-Next-Cursor visits every report exactly once, newest
+    first, and the last page carries no cursor.
+    """
+    company = _company_for(test_db, client, auth_headers)
+    for i in range(5):
+        _add_report(test_db, company.id, client_name=f"client-{i}",
+                    year=2026, month=1, created_at=datetime(2026, 1, i + 1))
+
+    seen = []
+    cursor = None
+    for _ in range(5):  # hard bound: must terminate well before this
+        url = "/reports/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        seen.extend(r["id"] for r in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+def test_list_reports_rejects_invalid_cursor(client, auth_headers, test_db):
+    _company_for(test_db, client, auth_headers)
+    response = client.get("/reports/?cursor=not-a-real-cursor", headers=auth_headers)
+    assert response.status_code == 400
+
+def test_dashboard_stats_etag_304(client, auth_headers, test_db):
+    """
+    Same data => 304 on If-None-Match; a new report rotates the ETag.
+    """
+    company = _company_for(test_db, client, auth_headers)
+
+    first = client.get("/reports/dashboard-stats", headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    cached = client.get("/reports/dashboard-stats",
+                        headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    _add_report(test_db, company.id, amount=100, category="Transporte")
+    fresh = client.get("/reports/dashboard-stats",
+                       headers={**auth_headers, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+
+def test_admin_summary_etag_rotates_on_budget_change(client, auth_headers, test_db):
+    """
+    admin/summary numbers depend on TourBudget too, so changing a budget must
+    invalidate the cached ETag even with no new report.
+    """
+    _company_for(test_db, client, auth_headers)
+
+    first = client.get("/reports/admin/summary", headers=auth_headers)
+    etag = first.headers["etag"]
+    assert client.get("/reports/admin/summary",
+                      headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+
+    assert client.post("/reports/budget",
+                       json={"tour_id": "T1", "budget_amount": 500, "category": "TOTAL"},
+                       headers=auth_headers).status_code == 200
+
+    fresh = client.get("/reports/admin/summary",
+                       headers={**auth_headers, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+
+def test_delete_report_happy_path(client, auth_headers, test_db):
+    company = _company_for(test_db, client, auth_headers)
+    report_id = _add_report(test_db, company.id, client_name="to delete").id
+
+    response = client.delete(f"/reports/{report_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"status": "deleted", "id": report_id}
+
+    test_db.expire_all()
+    assert test_db.query(models.Report).filter(models.Report.id == report_id).first() is None